@@ -2,12 +2,17 @@
 """Niri wallpaper manager - CLI tool for wallpaper management."""
 
 import os
+import shutil
+import signal
 import sys
 import subprocess
 import argparse
 from pathlib import Path
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List, Tuple
+
+# Internal callbacks re-invoked by rofi/fzf on every keystroke; they are
+# dispatched before argparse to keep per-preview startup cost down.
+INTERNAL_COMMANDS = ("_preview", "_accept", "_cancel", "_fzf_preview")
 
 
 class WallpaperManager:
@@ -19,16 +24,82 @@ class WallpaperManager:
         )
         self.config_file = Path.home() / ".config/niri/current-wallpaper"
         self.debug_log_file = Path.home() / ".config/niri/wallpaper-debug.log"
-        self.supported_extensions = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+        self.pid_file = Path.home() / ".config/niri/swaybg.pid"
+        self.supported_extensions = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+        self._swaybg_pid: Optional[int] = None
+        self._current_img: Optional[str] = None
+        self._scan_cache: Optional[Tuple[int, List[Path]]] = None
+        self._cfg_cache: Optional[Tuple[int, str]] = None
+        self._tool_cache: Dict[str, bool] = {}
+        self._debug_enabled = bool(os.getenv("WALLPAPER_DEBUG"))
+        self._debug_fh = None
+
+    def _alive_swaybg_pid(self) -> Optional[int]:
+        """Return the PID of the swaybg instance we spawned, if still alive."""
+        pid = self._swaybg_pid
+        if pid is None:
+            try:
+                pid = int(self.pid_file.read_text().strip())
+            except (OSError, ValueError):
+                return None
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return None
+        # A stale pidfile (reboot, session restart) may point at a recycled
+        # PID; only claim the instance when the process really is swaybg, so
+        # we never SIGTERM an unrelated program.
+        if self._swaybg_cmdline(pid) is None:
+            return None
+        return pid
+
+    def _swaybg_cmdline(self, pid: int) -> Optional[List[bytes]]:
+        """Return /proc/<pid>/cmdline argv, or None if it isn't swaybg."""
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                argv = f.read().split(b"\0")
+        except OSError:
+            return None
+        # Guard against PID reuse by another program.
+        if not argv or not argv[0].endswith(b"swaybg"):
+            return None
+        return argv
+
+    def _wallpaper_from_proc(self, pid: int) -> Optional[str]:
+        """Read the image path from /proc/<pid>/cmdline of a swaybg process."""
+        argv = self._swaybg_cmdline(pid)
+        if argv is None:
+            return None
+        for i, part in enumerate(argv):
+            if part == b"-i" and i + 1 < len(argv):
+                return argv[i + 1].decode(errors="surrogateescape")
+        return None
 
     def debug_log(self, message: str):
-        """Write debug message to log file."""
+        """Write debug message to log file (only when WALLPAPER_DEBUG is set)."""
+        if not self._debug_enabled:
+            return
+        from datetime import datetime
+
+        # Keep one line-buffered handle open for the life of the process
+        # instead of an open/write/close per log line.
+        if self._debug_fh is None:
+            self.debug_log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._debug_fh = open(self.debug_log_file, "a", buffering=1)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        with open(self.debug_log_file, "a") as f:
-            f.write(f"[{timestamp}] {message}\n")
+        self._debug_fh.write(f"[{timestamp}] {message}\n")
 
     def get_current_wallpaper(self) -> Optional[str]:
         """Get the currently running wallpaper from swaybg process."""
+        # Fast path: we know the swaybg PID, so read its /proc cmdline
+        # directly instead of forking pgrep for a full process scan.
+        pid = self._alive_swaybg_pid()
+        if pid is not None:
+            path = self._wallpaper_from_proc(pid)
+            if path is not None:
+                return path
+
+        # Fallback: an unmanaged swaybg instance (e.g. started elsewhere).
         try:
             result = subprocess.run(
                 ["pgrep", "-a", "swaybg"], capture_output=True, text=True, check=False
@@ -59,12 +130,26 @@ class WallpaperManager:
             print(f"Error: Wallpaper file not found: {img_path}", file=sys.stderr)
             return False
 
-        # Kill existing swaybg instances
-        subprocess.run(["pkill", "swaybg"], check=False, stderr=subprocess.DEVNULL)
+        old_pid = self._alive_swaybg_pid()
+
+        # Fast path: the requested image is already up, nothing to respawn.
+        # Fresh callback processes recover the active image from /proc.
+        if old_pid is not None:
+            current = self._current_img or self._wallpaper_from_proc(old_pid)
+            if current == img_path:
+                self._current_img = current
+                if save:
+                    self.save_config(img_path)
+                return True
 
-        # Start new swaybg instance
+        if old_pid is None:
+            # No record of a managed instance; clear any strays the old way.
+            subprocess.run(["pkill", "swaybg"], check=False, stderr=subprocess.DEVNULL)
+
+        # Spawn the replacement first so the old surface stays up until the
+        # new one is mapped (swaybg has no runtime image-swap IPC).
         try:
-            subprocess.Popen(
+            proc = subprocess.Popen(
                 ["swaybg", "-i", img_path, "-m", "fill"],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
@@ -73,6 +158,21 @@ class WallpaperManager:
             print("Error: swaybg not found. Please install it.", file=sys.stderr)
             return False
 
+        self._swaybg_pid = proc.pid
+        self._current_img = img_path
+        try:
+            self.pid_file.parent.mkdir(parents=True, exist_ok=True)
+            self.pid_file.write_text(f"{proc.pid}\n")
+        except OSError:
+            pass
+
+        # Retire the previous instance by PID instead of a blanket pkill.
+        if old_pid is not None:
+            try:
+                os.kill(old_pid, signal.SIGTERM)
+            except OSError:
+                pass
+
         # Save to config if requested
         if save:
             self.save_config(img_path)
@@ -80,31 +180,61 @@ class WallpaperManager:
         return True
 
     def save_config(self, img_path: str):
-        """Save wallpaper path to config file."""
+        """Save wallpaper path to config file atomically."""
         self.config_file.parent.mkdir(parents=True, exist_ok=True)
-        self.config_file.write_text(img_path + "\n")
+        tmp_file = self.config_file.with_name(self.config_file.name + ".tmp")
+        tmp_file.write_text(img_path + "\n")
+        os.replace(tmp_file, self.config_file)
+        try:
+            self._cfg_cache = (self.config_file.stat().st_mtime_ns, img_path)
+        except OSError:
+            self._cfg_cache = None
 
     def load_config(self) -> Optional[str]:
-        """Load wallpaper path from config file."""
-        if not self.config_file.exists():
+        """Load wallpaper path from config file (memoized on its mtime)."""
+        try:
+            st = self.config_file.stat()
+        except OSError:
             return None
 
+        if self._cfg_cache is not None and self._cfg_cache[0] == st.st_mtime_ns:
+            return self._cfg_cache[1]
+
         path = self.config_file.read_text().strip()
         if path and os.path.isfile(path):
+            self._cfg_cache = (st.st_mtime_ns, path)
             return path
         return None
 
     def find_wallpapers(self) -> List[Path]:
-        """Find all wallpaper files in wallpaper directory."""
-        if not self.wall_dir.is_dir():
+        """Find all wallpaper files in wallpaper directory.
+
+        The sorted result is cached on the directory's mtime, so repeated
+        calls within one process only re-scan when the directory changed.
+        """
+        try:
+            dir_mtime = os.stat(self.wall_dir).st_mtime_ns
+        except OSError:
             return []
 
+        if self._scan_cache is not None and self._scan_cache[0] == dir_mtime:
+            return self._scan_cache[1]
+
         wallpapers = []
-        for ext in self.supported_extensions:
-            wallpapers.extend(self.wall_dir.glob(f"*{ext}"))
-            wallpapers.extend(self.wall_dir.glob(f"*{ext.upper()}"))
+        try:
+            with os.scandir(self.wall_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    dot = entry.name.rfind(".")
+                    if dot >= 0 and entry.name[dot:].lower() in self.supported_extensions:
+                        wallpapers.append(Path(entry.path))
+        except OSError:
+            return []
 
-        return sorted(set(wallpapers), key=lambda p: p.name)
+        wallpapers.sort(key=lambda p: p.name)
+        self._scan_cache = (dir_mtime, wallpapers)
+        return wallpapers
 
     def get_default_wallpaper(self) -> Optional[str]:
         """Get a default wallpaper (first one in directory)."""
@@ -288,16 +418,14 @@ class WallpaperManager:
 
         self.debug_log(f"_select_fzf: found {len(wallpapers)} wallpapers")
 
-        # Build fzf input with full paths
+        # Each line carries the full path in field 1 and the display name in
+        # field 2; fzf shows only field 2 and hands field 1 to the preview.
         current_config = self.load_config()
         fzf_input = []
-        wallpaper_map = {}  # name -> path mapping
 
         for wp in wallpapers:
             marker = " *" if current_config and str(wp) == current_config else ""
-            display_name = f"{wp.name}{marker}"
-            fzf_input.append(display_name)
-            wallpaper_map[display_name] = str(wp)
+            fzf_input.append(f"{wp}\t{wp.name}{marker}")
 
         # Script path for preview callback
         script_path = Path(__file__).resolve()
@@ -312,8 +440,12 @@ class WallpaperManager:
                     "fzf",
                     "--prompt",
                     "Wallpaper> ",
+                    "--delimiter",
+                    "\t",
+                    "--with-nth",
+                    "2",
                     "--preview",
-                    f"{script_path} _fzf_preview {{}}",
+                    f"{script_path} _fzf_preview {{1}}",
                     "--preview-window",
                     "hidden",  # Hide preview window, we only need the side effect
                     "--bind",
@@ -331,22 +463,11 @@ class WallpaperManager:
 
             # If user made a selection (exit code 0)
             if result.returncode == 0 and result.stdout.strip():
-                selected_name = result.stdout.strip()
-                self.debug_log(f"_select_fzf: selected={selected_name}")
-
-                # Get the full path
-                if selected_name in wallpaper_map:
-                    wallpaper_path = wallpaper_map[selected_name]
-                    self.debug_log(
-                        f"_select_fzf: setting wallpaper to {wallpaper_path}"
-                    )
-                    self.set_wallpaper(wallpaper_path, save=True)
-                    return 0
-                else:
-                    self.debug_log(
-                        f"_select_fzf: wallpaper not found for {selected_name}"
-                    )
-                    return 1
+                # fzf prints the whole line; the path is the first field.
+                wallpaper_path = result.stdout.strip().split("\t", 1)[0]
+                self.debug_log(f"_select_fzf: setting wallpaper to {wallpaper_path}")
+                self.set_wallpaper(wallpaper_path, save=True)
+                return 0
             else:
                 # Canceled - restore original wallpaper
                 self.debug_log("_select_fzf: canceled")
@@ -448,44 +569,61 @@ class WallpaperManager:
 
     def _check_rofi(self) -> bool:
         """Check if rofi is available."""
-        try:
-            subprocess.run(["which", "rofi"], check=True, capture_output=True)
+        if self._have_tool("rofi"):
             return True
-        except subprocess.CalledProcessError:
-            print("Error: rofi not found. Please install it.", file=sys.stderr)
-            return False
+        print("Error: rofi not found. Please install it.", file=sys.stderr)
+        return False
 
     def _check_fzf(self, quiet: bool = False) -> bool:
         """Check if fzf is available."""
-        try:
-            subprocess.run(["which", "fzf"], check=True, capture_output=True)
+        if self._have_tool("fzf"):
             return True
-        except subprocess.CalledProcessError:
-            if not quiet:
-                print("Error: fzf not found. Please install it.", file=sys.stderr)
-            return False
-
-    def _fzf_preview(self, display_name: str) -> int:
-        """Preview callback for fzf (internal)."""
-        self.debug_log(f"_fzf_preview: display_name={display_name}")
+        if not quiet:
+            print("Error: fzf not found. Please install it.", file=sys.stderr)
+        return False
+
+    def _have_tool(self, name: str) -> bool:
+        """PATH lookup via shutil.which, cached per process."""
+        found = self._tool_cache.get(name)
+        if found is None:
+            found = shutil.which(name) is not None
+            self._tool_cache[name] = found
+        return found
+
+    def _fzf_preview(self, img_path: str) -> int:
+        """Preview callback for fzf (internal).
+
+        Receives the full wallpaper path (field 1 of the fzf line), so no
+        directory scan or name lookup is needed.
+        """
+        self.debug_log(f"_fzf_preview: img_path={img_path}")
+        return 0 if self.set_wallpaper(img_path, save=False) else 1
 
-        # Remove marker if present
-        name = display_name.rstrip(" *")
 
-        # Find wallpaper by name
-        wallpapers = self.find_wallpapers()
-        for wp in wallpapers:
-            if wp.name == name:
-                self.debug_log(f"_fzf_preview: setting wallpaper to {wp}")
-                self.set_wallpaper(str(wp), save=False)
-                return 0
+def _fast_dispatch(command: str, args: List[str]) -> int:
+    """Dispatch internal callbacks without paying argparse construction."""
+    manager = WallpaperManager()
 
-        self.debug_log(f"_fzf_preview: wallpaper not found for {name}")
-        return 1
+    if command == "_preview":
+        return manager._preview(args[0] if args else None)
+    if command == "_accept":
+        return manager._accept(args[0] if args else None)
+    if command == "_cancel":
+        return manager._cancel()
+    if command == "_fzf_preview":
+        if not args:
+            return 1
+        return manager._fzf_preview(args[0])
+    return 1
 
 
 def main():
     """Main entry point."""
+    # Hot path: rofi/fzf callbacks fire on every keystroke, so skip the
+    # argparse setup entirely for them.
+    if len(sys.argv) >= 2 and sys.argv[1] in INTERNAL_COMMANDS:
+        return _fast_dispatch(sys.argv[1], sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="Niri wallpaper manager",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -506,17 +644,7 @@ Examples:
 
     parser.add_argument(
         "command",
-        choices=[
-            "select",
-            "set",
-            "restore",
-            "current",
-            "list",
-            "_preview",
-            "_accept",
-            "_cancel",
-            "_fzf_preview",
-        ],
+        choices=["select", "set", "restore", "current", "list"],
         help="Command to execute",
     )
     parser.add_argument("args", nargs="*", help="Command arguments")
@@ -543,23 +671,6 @@ Examples:
     elif args.command == "list":
         return manager.cmd_list()
 
-    # Internal callbacks (prefixed with _)
-    elif args.command == "_preview":
-        path = args.args[0] if args.args else None
-        return manager._preview(path)
-
-    elif args.command == "_accept":
-        path = args.args[0] if args.args else None
-        return manager._accept(path)
-
-    elif args.command == "_cancel":
-        return manager._cancel()
-
-    elif args.command == "_fzf_preview":
-        if not args.args:
-            return 1
-        return manager._fzf_preview(args.args[0])
-
     else:
         parser.print_help()
         return 1
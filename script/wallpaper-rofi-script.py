@@ -2,6 +2,7 @@
 """Rofi script mode for wallpaper selection with live preview."""
 
 import os
+import signal
 import sys
 import subprocess
 from pathlib import Path
@@ -10,13 +11,23 @@ from pathlib import Path
 WALL_DIR = Path(os.getenv('WALL_DIR', Path.home() / '.config/niri/wallpaper'))
 CONFIG_FILE = Path.home() / '.config/niri/current-wallpaper'
 DEBUG_LOG = Path.home() / '.config/niri/wallpaper-rofi-debug.log'
+PID_FILE = Path.home() / '.config/niri/swaybg.pid'
+
+_DEBUG_ENABLED = bool(os.getenv('WALLPAPER_DEBUG'))
+_debug_fh = None
 
 def debug_log(msg):
-    """Write debug log."""
+    """Write debug log (only when WALLPAPER_DEBUG is set)."""
+    global _debug_fh
+    if not _DEBUG_ENABLED:
+        return
     from datetime import datetime
+    # Keep one line-buffered handle open instead of open/write/close per line.
+    if _debug_fh is None:
+        DEBUG_LOG.parent.mkdir(parents=True, exist_ok=True)
+        _debug_fh = open(DEBUG_LOG, 'a', buffering=1)
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-    with open(DEBUG_LOG, 'a') as f:
-        f.write(f'[{timestamp}] {msg}\n')
+    _debug_fh.write(f'[{timestamp}] {msg}\n')
 
 def load_config():
     """Load saved wallpaper from config."""
@@ -31,22 +42,73 @@ def save_config(path):
     CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
     CONFIG_FILE.write_text(path + '\n')
 
+def _is_swaybg(pid):
+    """True if /proc/<pid>/cmdline says the process really is swaybg."""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            argv = f.read().split(b'\0')
+    except OSError:
+        return False
+    return bool(argv) and argv[0].endswith(b'swaybg')
+
+def _alive_swaybg_pid():
+    """Return the PID of the swaybg instance we spawned, if still alive."""
+    try:
+        pid = int(PID_FILE.read_text().strip())
+    except (OSError, ValueError):
+        return None
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return None
+    # A stale pidfile may point at a recycled PID; never claim (or later
+    # SIGTERM) a process that isn't actually swaybg.
+    if not _is_swaybg(pid):
+        return None
+    return pid
+
 def set_wallpaper(img_path, save=False):
     """Set wallpaper using swaybg."""
-    subprocess.run(['pkill', 'swaybg'], check=False, stderr=subprocess.DEVNULL)
-    subprocess.Popen(['swaybg', '-i', img_path, '-m', 'fill'],
-                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    old_pid = _alive_swaybg_pid()
+    if old_pid is None:
+        # No record of a managed instance; clear any strays the old way.
+        subprocess.run(['pkill', 'swaybg'], check=False, stderr=subprocess.DEVNULL)
+
+    # Spawn the replacement first so the old surface stays up until the
+    # new one is mapped (swaybg has no runtime image-swap IPC).
+    proc = subprocess.Popen(['swaybg', '-i', img_path, '-m', 'fill'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        PID_FILE.parent.mkdir(parents=True, exist_ok=True)
+        PID_FILE.write_text(f'{proc.pid}\n')
+    except OSError:
+        pass
+
+    # Retire the previous instance by PID instead of a blanket pkill.
+    if old_pid is not None:
+        try:
+            os.kill(old_pid, signal.SIGTERM)
+        except OSError:
+            pass
+
     if save:
         save_config(img_path)
 
 def find_wallpapers():
     """Find all wallpapers."""
-    extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+    extensions = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
     wallpapers = []
-    for ext in extensions:
-        wallpapers.extend(WALL_DIR.glob(f'*{ext}'))
-        wallpapers.extend(WALL_DIR.glob(f'*{ext.upper()}'))
-    return sorted(set(wallpapers), key=lambda p: p.name)
+    try:
+        with os.scandir(WALL_DIR) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                dot = entry.name.rfind('.')
+                if dot >= 0 and entry.name[dot:].lower() in extensions:
+                    wallpapers.append(Path(entry.path))
+    except OSError:
+        return []
+    return sorted(wallpapers, key=lambda p: p.name)
 
 # Rofi script mode
 if __name__ == '__main__':
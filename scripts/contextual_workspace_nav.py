@@ -7,41 +7,200 @@ stacked windows in the requested direction.
 
 from __future__ import annotations
 
-import argparse
 import json
+import os
+import socket
 import subprocess
 import sys
 import time
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+import types
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 Window = Dict[str, Any]
 Identity = Tuple[Tuple[str, Any], ...]
+Snapshot = Tuple[Tuple[str, Any], ...]
+
+# orjson parses large payloads (the windows list) several times faster than
+# the stdlib; both accept bytes, so the fallback is a drop-in.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Keys that identify a window, in order of preference; the fallback set is
+# only consulted when none of the primary keys is present.
+_PRIMARY_KEYS = (
+    "persistent_id",
+    "window_id",
+    "id",
+    "surface_id",
+    "toplevel_id",
+    "wayland_id",
+)
+_FALLBACK_KEYS = ("workspace_id", "app_id", "title", "pid")
+
+# Post-action polling: start fast, back off, give up at the deadline.
+_POLL_DEADLINE_NS = 15_000_000
+_POLL_INTERVAL_NS = 500_000
+_POLL_INTERVAL_MAX_NS = 2_000_000
+
+# Query socket of niri_state_daemon (see scripts/niri_state_daemon.py).
+_STATE_SOCKET = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "niri-state.sock"
+)
+
+# Once a daemon query fails we stop retrying for the rest of this process;
+# a keypress handler can't afford repeated connect timeouts.
+_state_daemon_down = False
+
+# Cached connection to niri's own IPC socket ($NIRI_SOCKET).
+_niri_sock: Optional[socket.socket] = None
+
+
+def _get_niri_sock() -> Optional[socket.socket]:
+    global _niri_sock
+    if _niri_sock is not None:
+        return _niri_sock
+
+    path = os.environ.get("NIRI_SOCKET")
+    if not path:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1.0)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    _niri_sock = sock
+    return sock
+
+
+def _niri_ipc_reply(request: Any) -> Optional[Dict[str, Any]]:
+    """Send one request over niri's IPC socket and return the raw reply.
+
+    The reply is a dict with either an "Ok" or an "Err" key. Returns None
+    when the socket is unavailable; callers then fall back to `niri msg`.
+    Reconnects transparently if niri closed the cached connection.
+    """
+    global _niri_sock
+    for attempt in (0, 1):
+        sock = _get_niri_sock()
+        if sock is None:
+            return None
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    raise BrokenPipeError("niri closed the IPC connection")
+                buf += chunk
+            reply = _json_loads(buf)
+        except (OSError, ValueError):
+            try:
+                sock.close()
+            finally:
+                _niri_sock = None
+            if attempt == 0:
+                continue
+            return None
+        if isinstance(reply, dict):
+            return reply
+        return None
+    return None
+
+
+def _niri_ipc(request: Any) -> Optional[Any]:
+    """Return the Ok payload for `request`, or None on error/unavailability."""
+    reply = _niri_ipc_reply(request)
+    if reply is not None and "Ok" in reply:
+        return reply["Ok"]
+    return None
+
+
+def _action_request(action: str) -> Dict[str, Any]:
+    """Translate a kebab-case `niri msg action` name into an IPC request."""
+    variant = "".join(part.capitalize() for part in action.split("-"))
+    return {"Action": {variant: {}}}
+
+
+def _spawn_state_daemon() -> None:
+    """Start niri_state_daemon in the background (a no-op if one is alive)."""
+    daemon = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "niri_state_daemon.py"
+    )
+    try:
+        subprocess.Popen(
+            [sys.executable, daemon],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+
+def _query_state() -> Optional[Dict[str, Any]]:
+    """Fetch the cached state snapshot from the daemon, spawning it if needed.
+
+    Returns None when the daemon is unavailable; callers then fall back to
+    the one-shot `niri msg` path.
+    """
+    global _state_daemon_down
+    if _state_daemon_down:
+        return None
+
+    for attempt in (0, 1):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.05)
+                sock.connect(_STATE_SOCKET)
+                chunks = []
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            data = _json_loads(b"".join(chunks))
+            if isinstance(data, dict):
+                return data
+        except (OSError, ValueError):
+            pass
+        if attempt == 0:
+            _spawn_state_daemon()
+            time.sleep(0.05)
+
+    _state_daemon_down = True
+    return None
 
 
 def _run_niri_json(command: List[str]) -> Optional[Any]:
     """Run a `niri msg -j ...` command and return parsed JSON, or None on error."""
     try:
+        # close_fds=False skips the O(RLIMIT_NOFILE) close loop; a keybinding
+        # handler inherits nothing sensitive worth hiding from niri.
         result = subprocess.run(
             command,
             check=True,
-            text=True,
+            stdin=subprocess.DEVNULL,
             capture_output=True,
+            close_fds=False,
         )
     except (OSError, subprocess.CalledProcessError):
         return None
 
     try:
-        return json.loads(result.stdout)
-    except json.JSONDecodeError:
+        return _json_loads(result.stdout)
+    except ValueError:
         return None
 
 
-def _collect_windows() -> List[Window]:
-    """Return the list of windows reported by `niri msg -j windows`."""
-    data = _run_niri_json(["niri", "msg", "-j", "windows"])
-    if data is None:
-        return []
-
+def _windows_from_payload(data: Any) -> List[Window]:
+    """Extract a window list from a `windows` query payload."""
     if isinstance(data, list):
         return [w for w in data if isinstance(w, dict)]
 
@@ -53,28 +212,75 @@ def _collect_windows() -> List[Window]:
     return []
 
 
+def _collect_windows() -> List[Window]:
+    """Return the current window list.
+
+    Preference order: niri IPC socket (authoritative, no fork), state
+    daemon snapshot, then a one-shot `niri msg -j windows`.
+    """
+    payload = _niri_ipc("Windows")
+    if isinstance(payload, dict):
+        return _windows_from_payload(payload.get("Windows"))
+
+    state = _query_state()
+    if state is not None:
+        windows = state.get("windows")
+        if isinstance(windows, list):
+            return [w for w in windows if isinstance(w, dict)]
+
+    return _windows_from_payload(_run_niri_json(["niri", "msg", "-j", "windows"]))
+
+
 def _run_action(action: str) -> bool:
+    reply = _niri_ipc_reply(_action_request(action))
+    if reply is not None:
+        return "Ok" in reply
+
+    # Without the IPC socket, spawn niri via posix_spawnp: it uses vfork
+    # under the hood and skips Popen's per-fd bookkeeping, and we need no
+    # pipes for a fire-and-wait action. Its stdio goes to /dev/null so the
+    # output never leaks into whatever launched the keybinding.
+    devnull_actions = [
+        (os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_RDWR, 0) for fd in (0, 1, 2)
+    ]
     try:
-        subprocess.run(["niri", "msg", "action", action], check=True)
-        return True
-    except (OSError, subprocess.CalledProcessError):
+        pid = os.posix_spawnp(
+            "niri",
+            ["niri", "msg", "action", action],
+            os.environ,
+            file_actions=devnull_actions,
+        )
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status) == 0
+    except OSError:
         return False
 
 
-def _overview_state() -> Optional[Dict[str, Any]]:
+def _overview_is_open() -> Optional[bool]:
+    """Return the Overview state, in the usual preference order.
+
+    niri IPC socket (authoritative, no fork), state daemon snapshot, then a
+    one-shot `niri msg -j overview-state` — the same order as
+    `_collect_windows`, so a session without a running daemon doesn't pay
+    the daemon spawn/connect rounds before asking the socket it already has.
+    """
+    payload = _niri_ipc("OverviewState")
+    if isinstance(payload, dict) and isinstance(payload.get("OverviewState"), dict):
+        is_open = payload["OverviewState"].get("is_open")
+        if isinstance(is_open, bool):
+            return is_open
+
+    state = _query_state()
+    if state is not None:
+        is_open = state.get("overview_is_open")
+        if isinstance(is_open, bool):
+            return is_open
+
     data = _run_niri_json(["niri", "msg", "-j", "overview-state"])
     if isinstance(data, dict):
-        return data
-    return None
-
-
-def _overview_is_open() -> Optional[bool]:
-    state = _overview_state()
-    if state is None:
-        return None
-    is_open = state.get("is_open")
-    if isinstance(is_open, bool):
-        return is_open
+        is_open = data.get("is_open")
+        if isinstance(is_open, bool):
+            return is_open
     return None
 
 
@@ -82,89 +288,135 @@ def _focused_window(windows: Sequence[Window]) -> Optional[Window]:
     return next((w for w in windows if w.get("is_focused")), None)
 
 
-def _window_identity(win: Window) -> Identity:
-    """Build a best-effort identity tuple to match the same window later."""
-    candidate_keys = (
-        "persistent_id",
-        "window_id",
-        "id",
-        "surface_id",
-        "toplevel_id",
-        "wayland_id",
-    )
-    parts: List[Tuple[str, Any]] = []
-    for key in candidate_keys:
-        value = win.get(key)
-        if isinstance(value, (str, int)):
-            parts.append((key, value))
-            break
+def _focused_window_fast() -> Optional[Window]:
+    """Return just the focused window, without pulling the full window list.
 
-    if not parts:
-        fallback_keys = ("workspace_id", "app_id", "title", "pid")
-        for key in fallback_keys:
-            parts.append((key, win.get(key)))
+    The focus path only needs to know whether focus changed, so the much
+    smaller focused-window payload replaces the whole `windows` query.
+    """
+    payload = _niri_ipc("FocusedWindow")
+    if isinstance(payload, dict):
+        win = payload.get("FocusedWindow")
+        return win if isinstance(win, dict) else None
 
-    return tuple(parts)
+    state = _query_state()
+    if state is not None:
+        focused_id = state.get("focused_id")
+        windows = state.get("windows")
+        if isinstance(windows, list):
+            return next(
+                (
+                    w
+                    for w in windows
+                    if isinstance(w, dict) and w.get("id") == focused_id
+                ),
+                None,
+            )
 
+    data = _run_niri_json(["niri", "msg", "-j", "focused-window"])
+    return data if isinstance(data, dict) else None
 
-def _window_snapshot(win: Window) -> str:
-    """Serialize stable bits of the window to detect layout changes."""
-    snapshot: Dict[str, Any] = {
-        "workspace_id": win.get("workspace_id"),
-        "layout": win.get("layout"),
-    }
-    for key, value in win.items():
-        if "column" in key:
-            snapshot[key] = value
-    return json.dumps(snapshot, sort_keys=True, allow_nan=True)
-
-
-def _find_window_by_identity(
-    windows: Sequence[Window], identity: Identity
-) -> Optional[Window]:
-    for win in windows:
-        if _window_identity(win) == identity:
-            return win
-    return None
+
+def _window_identity(
+    win: Window, cache: Optional[Dict[int, Identity]] = None
+) -> Identity:
+    """Build a best-effort identity tuple to match the same window later.
+
+    `cache` maps id(win) to the computed identity; callers that keep the
+    window dicts alive for the duration (as main does) can pass one so each
+    window is identity-computed at most once.
+    """
+    if cache is not None:
+        cached = cache.get(id(win))
+        if cached is not None:
+            return cached
+
+    identity: Identity = ()
+    for key in _PRIMARY_KEYS:
+        value = win.get(key)
+        if isinstance(value, (str, int)):
+            identity = ((key, value),)
+            break
+    else:
+        identity = tuple((key, win.get(key)) for key in _FALLBACK_KEYS)
+    if cache is not None:
+        cache[id(win)] = identity
+    return identity
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists into comparable, hashable tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# Which keys of a window dict mention "column" is fixed by the niri version,
+# not the window, so the substring scan only needs to run once per process.
+_COLUMN_KEYS_CACHE: Optional[frozenset] = None
+
+
+def _window_snapshot(win: Window) -> Snapshot:
+    """Collect stable bits of the window to detect layout changes.
+
+    The only consumer is an equality comparison, so a sorted tuple beats
+    serializing to JSON: no escaping or encoding, and comparison happens
+    at tuple speed.
+    """
+    global _COLUMN_KEYS_CACHE
+    if _COLUMN_KEYS_CACHE is None:
+        _COLUMN_KEYS_CACHE = frozenset(key for key in win if "column" in key)
+    items = [
+        ("workspace_id", win.get("workspace_id")),
+        ("layout", _freeze(win.get("layout"))),
+    ]
+    items.extend((key, _freeze(win.get(key))) for key in _COLUMN_KEYS_CACHE)
+    items.sort()
+    return tuple(items)
+
+
+def _poll_until(fetch: Callable[[], Any], settled: Callable[[Any], bool]) -> Any:
+    """Re-run `fetch` until `settled(result)` is true or the deadline hits.
+
+    Most compositor updates land well under a millisecond, so a short poll
+    interval with exponential backoff removes the fixed post-action delay on
+    the common path while keeping the worst case bounded. Returns the last
+    fetched value either way.
+    """
+    deadline = time.monotonic_ns() + _POLL_DEADLINE_NS
+    interval_ns = _POLL_INTERVAL_NS
+    while True:
+        value = fetch()
+        if settled(value):
+            return value
+        if time.monotonic_ns() >= deadline:
+            return value
+        time.sleep(interval_ns / 1e9)
+        interval_ns = min(interval_ns * 2, _POLL_INTERVAL_MAX_NS)
+
+
+def _index_by_identity(
+    windows: Sequence[Window], cache: Optional[Dict[int, Identity]] = None
+) -> Dict[Identity, Window]:
+    """Build an identity -> window map in a single pass."""
+    return {_window_identity(win, cache): win for win in windows}
 
 
 def _is_focus_action(action: str) -> bool:
     return action.startswith("focus-")
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(
-        description="Context-aware niri workspace/window navigation helper."
-    )
-    parser.add_argument(
-        "--direction",
-        choices=("up", "down", "left", "right"),
-        required=True,
-        help="Navigation direction.",
-    )
-    parser.add_argument(
-        "--primary-action",
-        required=True,
-        help="Action to run when another window exists in the current column.",
-    )
-    parser.add_argument(
-        "--fallback-action",
-        required=True,
-        help="Action to run when there is no window in the requested direction.",
-    )
-    parser.add_argument(
-        "--overview-action",
-        help="Action to run when the Overview is open (defaults to fallback).",
-    )
-    parser.add_argument(
-        "--debug",
-        action="store_true",
-        help="Print debug information to stderr.",
-    )
-    args = parser.parse_args()
+def _run_fallback(args: types.SimpleNamespace) -> int:
+    """Run the fallback action, or the overview action when Overview is open.
 
-    overview_open = _overview_is_open()
-    if overview_open:
+    The overview state is only queried here, on the cold branch: when the
+    Overview is open every focus/move action is a no-op under niri, so
+    control always ends up here anyway — checking upfront paid an extra
+    query on every keypress for a state that is rarely open.
+    """
+    if _overview_is_open():
         action = args.overview_action or args.fallback_action
         if args.debug:
             print(
@@ -173,34 +425,132 @@ def main() -> int:
             )
         return 0 if _run_action(action) else 1
 
-    windows_before = _collect_windows()
-    if not windows_before:
+    if args.debug:
+        print(f"Running fallback action '{args.fallback_action}'.", file=sys.stderr)
+    return 0 if _run_action(args.fallback_action) else 1
+
+
+_USAGE = """\
+usage: contextual_workspace_nav.py --direction {up,down,left,right}
+           --primary-action ACTION --fallback-action ACTION
+           [--overview-action ACTION] [--verify | --no-verify] [--debug]
+
+Context-aware niri workspace/window navigation helper.
+
+  --direction        Navigation direction.
+  --primary-action   Action to run when another window exists in the column.
+  --fallback-action  Action to run when there is no window in the direction.
+  --overview-action  Action to run when the Overview is open (defaults to
+                     the fallback action).
+  --verify           Re-query niri after the primary action to detect no-op
+                     actions (the default).
+  --no-verify        Trust niri's success reply and skip the re-query; the
+                     fallback action then never runs after a reported
+                     success.
+  --debug            Print debug information to stderr.
+"""
+
+
+def _usage_error(message: str) -> int:
+    print(f"error: {message}", file=sys.stderr)
+    print(_USAGE, file=sys.stderr, end="")
+    return 2
+
+
+def _parse_args(argv: Sequence[str]) -> Optional[types.SimpleNamespace]:
+    """Hand-rolled argument parsing.
+
+    This script runs once per keypress, and argparse drags in gettext and
+    builds the full parser graph before any work happens; a dict walk over
+    four options does the same job for free. Returns None (after printing
+    a message) on bad arguments.
+    """
+    opts: Dict[str, Any] = {
+        "--direction": None,
+        "--primary-action": None,
+        "--fallback-action": None,
+        "--overview-action": None,
+        "--verify": None,
+        "--debug": False,
+    }
+    it = iter(argv)
+    for arg in it:
+        if arg in ("-h", "--help"):
+            print(_USAGE, end="")
+            raise SystemExit(0)
+        if arg == "--debug":
+            opts[arg] = True
+        elif arg == "--verify":
+            opts[arg] = True
+        elif arg == "--no-verify":
+            opts["--verify"] = False
+        elif arg in opts:
+            value = next(it, None)
+            if value is None:
+                _usage_error(f"missing value for {arg}")
+                return None
+            opts[arg] = value
+        else:
+            _usage_error(f"unrecognized argument: {arg}")
+            return None
+
+    if opts["--direction"] not in ("up", "down", "left", "right"):
+        _usage_error("--direction must be one of up, down, left, right")
+        return None
+    for required in ("--primary-action", "--fallback-action"):
+        if not opts[required]:
+            _usage_error(f"{required} is required")
+            return None
+
+    return types.SimpleNamespace(
+        **{key.lstrip("-").replace("-", "_"): value for key, value in opts.items()}
+    )
+
+
+def main() -> int:
+    args = _parse_args(sys.argv[1:])
+    if args is None:
+        return 2
+
+    primary_is_focus = _is_focus_action(args.primary_action)
+    # Verification is on by default: niri reports success even for a no-op
+    # action (move at the edge of a workspace, focus that lands on itself),
+    # and detecting exactly that case is what routes us to the fallback.
+    # --no-verify is an explicit opt-in for bindings that never want the
+    # fallback and would rather skip the post-action re-query.
+    verify = args.verify if args.verify is not None else True
+
+    # Focus actions (and unverified moves) only need the focused window, so
+    # skip the full windows query on those paths entirely.
+    windows_before: List[Window] = []
+    if primary_is_focus or not verify:
+        focused_before = _focused_window_fast()
+    else:
+        windows_before = _collect_windows()
+        focused_before = _focused_window(windows_before)
+
+    if not primary_is_focus and verify and not windows_before:
         if args.debug:
             print(
                 "No windows present (likely an empty workspace); running fallback.",
                 file=sys.stderr,
             )
-        return 0 if _run_action(args.fallback_action) else 1
+        return _run_fallback(args)
 
-    focused_before = _focused_window(windows_before)
     if not focused_before:
         if args.debug:
             print("No focused window available; running fallback.", file=sys.stderr)
-        return 0 if _run_action(args.fallback_action) else 1
+        return _run_fallback(args)
 
     if focused_before.get("is_floating"):
         if args.debug:
             print("Focused window is floating; running fallback.", file=sys.stderr)
-        return 0 if _run_action(args.fallback_action) else 1
-
-    focused_identity = _window_identity(focused_before)
-    before_snapshot = _window_snapshot(focused_before)
-    primary_is_focus = _is_focus_action(args.primary_action)
+        return _run_fallback(args)
 
     if args.debug:
         print(
             f"Running primary action '{args.primary_action}' "
-            f"(direction={args.direction}).",
+            f"(direction={args.direction}, verify={verify}).",
             file=sys.stderr,
         )
 
@@ -209,35 +559,71 @@ def main() -> int:
             print("Primary action failed to execute.", file=sys.stderr)
         return 1
 
-    # Allow the compositor a brief moment to apply the change before re-querying.
-    time.sleep(0.01)
-    windows_after = _collect_windows()
-    if not windows_after:
+    if not verify:
         if args.debug:
-            print(
-                "Could not re-query windows after the primary action.", file=sys.stderr
-            )
-        return 1
+            print("Trusting niri's success reply; skipping re-query.", file=sys.stderr)
+        return 0
 
+    # Shared for the windows kept alive by main; the poll predicates see
+    # short-lived intermediate objects, so they don't use it.
+    identity_cache: Dict[int, Identity] = {}
+
+    focused_identity = _window_identity(focused_before, identity_cache)
+    before_snapshot = _window_snapshot(focused_before) if not primary_is_focus else None
+
+    # Poll until the compositor reflects the change (or the deadline passes);
+    # unsettled layouts then fall through to the fallback logic below.
     fallback_needed: bool
     if primary_is_focus:
-        focused_after = _focused_window(windows_after)
-        fallback_needed = not focused_after or (
-            _window_identity(focused_after) == focused_identity
+
+        def _focus_settled(focused: Optional[Window]) -> bool:
+            return (
+                focused is not None
+                and _window_identity(focused) != focused_identity
+            )
+
+        focused_after = _poll_until(_focused_window_fast, _focus_settled)
+        after_identity = (
+            _window_identity(focused_after, identity_cache) if focused_after else None
         )
+        fallback_needed = after_identity is None or after_identity == focused_identity
         if args.debug:
-            after_identity = _window_identity(focused_after) if focused_after else None
             print(
                 f"Focused identity before={focused_identity} after={after_identity} "
                 f"-> fallback_needed={fallback_needed}",
                 file=sys.stderr,
             )
     else:
-        moved_window = _find_window_by_identity(windows_after, focused_identity)
+
+        # The predicate already indexes each fetched window list and snapshots
+        # the match; stash both so the post-loop logic repeats neither.
+        moved_box: List[Optional[Window]] = [None]
+        moved_snapshot_box: List[Optional[Snapshot]] = [None]
+
+        def _move_settled(windows: Sequence[Window]) -> bool:
+            if not windows:
+                return False
+            moved = _index_by_identity(windows).get(focused_identity)
+            moved_box[0] = moved
+            moved_snapshot_box[0] = (
+                _window_snapshot(moved) if moved is not None else None
+            )
+            return moved is None or moved_snapshot_box[0] != before_snapshot
+
+        windows_after = _poll_until(_collect_windows, _move_settled)
+        if not windows_after:
+            if args.debug:
+                print(
+                    "Could not re-query windows after the primary action.",
+                    file=sys.stderr,
+                )
+            return 1
+
+        moved_window = moved_box[0]
         if moved_window is None:
             fallback_needed = False
         else:
-            fallback_needed = _window_snapshot(moved_window) == before_snapshot
+            fallback_needed = moved_snapshot_box[0] == before_snapshot
         if args.debug:
             print(
                 "Move snapshot changed="
@@ -246,9 +632,7 @@ def main() -> int:
             )
 
     if fallback_needed:
-        if args.debug:
-            print(f"Running fallback action '{args.fallback_action}'.", file=sys.stderr)
-        return 0 if _run_action(args.fallback_action) else 1
+        return _run_fallback(args)
 
     return 0
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Mirror niri window/overview state from `niri msg -j event-stream` and answer
+queries over a Unix socket.
+
+Per-keypress helpers such as contextual_workspace_nav otherwise fork a fresh
+`niri msg` (and parse its full JSON output) for every lookup. This daemon
+subscribes to the event stream once, keeps the current state in memory, and
+serves it to clients as a single JSON snapshot per connection — a socket
+round-trip instead of a fork+exec.
+
+The daemon is started on demand by its clients; running it by hand is only
+needed for debugging.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+SOCKET_PATH = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "niri-state.sock"
+)
+
+# Optional fast JSON parser; the stdlib also accepts bytes, so it's a
+# drop-in fallback (mirrors contextual_workspace_nav).
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+class NiriState:
+    """Window and overview state replicated from the niri event stream."""
+
+    def __init__(self) -> None:
+        self.windows: Dict[int, Dict[str, Any]] = {}
+        self.focused_id: Optional[int] = None
+        self.overview_is_open = False
+        # The event stream replays the full state on subscription; don't
+        # serve snapshots until that initial WindowsChanged has arrived.
+        self.ready = False
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        if "WindowsChanged" in event:
+            windows = event["WindowsChanged"].get("windows") or []
+            self.windows = {
+                w["id"]: w for w in windows if isinstance(w, dict) and "id" in w
+            }
+            self.focused_id = next(
+                (wid for wid, w in self.windows.items() if w.get("is_focused")),
+                None,
+            )
+            self.ready = True
+
+        elif "WindowOpenedOrChanged" in event:
+            win = event["WindowOpenedOrChanged"].get("window")
+            if isinstance(win, dict) and "id" in win:
+                self.windows[win["id"]] = win
+                if win.get("is_focused"):
+                    self._set_focus(win["id"])
+
+        elif "WindowClosed" in event:
+            wid = event["WindowClosed"].get("id")
+            self.windows.pop(wid, None)
+            if self.focused_id == wid:
+                self.focused_id = None
+
+        elif "WindowFocusChanged" in event:
+            self._set_focus(event["WindowFocusChanged"].get("id"))
+
+        elif "WindowLayoutsChanged" in event:
+            for change in event["WindowLayoutsChanged"].get("changes") or []:
+                if isinstance(change, (list, tuple)) and len(change) == 2:
+                    wid, layout = change
+                    win = self.windows.get(wid)
+                    if win is not None:
+                        win["layout"] = layout
+
+        elif "OverviewOpenedOrClosed" in event:
+            is_open = event["OverviewOpenedOrClosed"].get("is_open")
+            if isinstance(is_open, bool):
+                self.overview_is_open = is_open
+
+    def _set_focus(self, wid: Optional[int]) -> None:
+        if self.focused_id is not None:
+            old = self.windows.get(self.focused_id)
+            if old is not None:
+                old["is_focused"] = False
+        self.focused_id = wid
+        if wid is not None:
+            win = self.windows.get(wid)
+            if win is not None:
+                win["is_focused"] = True
+
+    def snapshot(self) -> bytes:
+        return json.dumps(
+            {
+                "windows": list(self.windows.values()),
+                "focused_id": self.focused_id,
+                "overview_is_open": self.overview_is_open,
+            }
+        ).encode()
+
+
+def _claim_socket() -> Optional[socket.socket]:
+    """Bind the query socket, refusing to start if a live daemon holds it.
+
+    The probe/unlink/bind sequence is serialized with an flock'd lockfile:
+    two daemons auto-spawned by near-simultaneous keypresses could otherwise
+    both fail the probe, and the loser's unlink would detach the winner's
+    freshly bound socket, leaving it running but unreachable.
+    """
+    try:
+        lock_fd = os.open(SOCKET_PATH + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.settimeout(0.2)
+            probe.connect(SOCKET_PATH)
+            return None  # Another daemon is alive and serving.
+        except OSError:
+            pass
+        finally:
+            probe.close()
+
+        try:
+            os.unlink(SOCKET_PATH)
+        except OSError:
+            pass
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(SOCKET_PATH)
+        server.listen(8)
+        server.setblocking(False)
+        return server
+    finally:
+        os.close(lock_fd)  # Releases the flock with it.
+
+
+def main() -> int:
+    try:
+        proc = subprocess.Popen(
+            ["niri", "msg", "-j", "event-stream"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError as exc:
+        print(f"Failed to start niri event stream: {exc}", file=sys.stderr)
+        return 1
+
+    server = _claim_socket()
+    if server is None:
+        proc.terminate()
+        return 0
+
+    def _shutdown(signum, frame):  # noqa: ARG001
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    state = NiriState()
+    sel = selectors.DefaultSelector()
+    # Select on the raw fd and split lines ourselves: readline() on the
+    # buffered reader would pull a whole burst (niri's subscription replay,
+    # or the several events a keypress emits) into Python's buffer while
+    # returning a single line, leaving the rest invisible to select() until
+    # the *next* event arrives — the served state would lag chronically.
+    events_fd = proc.stdout.fileno()
+    sel.register(events_fd, selectors.EVENT_READ, "events")
+    sel.register(server, selectors.EVENT_READ, "query")
+    pending = b""
+
+    try:
+        while True:
+            for key, _ in sel.select():
+                if key.data == "events":
+                    chunk = os.read(events_fd, 65536)
+                    if not chunk:
+                        return 0  # niri exited; the stream is gone.
+                    pending += chunk
+                    while True:
+                        line, sep, rest = pending.partition(b"\n")
+                        if not sep:
+                            break
+                        pending = rest
+                        try:
+                            event = _json_loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(event, dict):
+                            state.apply(event)
+                else:
+                    try:
+                        conn, _ = server.accept()
+                    except OSError:
+                        continue
+                    with conn:
+                        if state.ready:
+                            try:
+                                conn.sendall(state.snapshot())
+                            except OSError:
+                                pass
+    finally:
+        try:
+            os.unlink(SOCKET_PATH)
+        except OSError:
+            pass
+        proc.terminate()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
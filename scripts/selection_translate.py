@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
-"""Translate selection with Crow and show a copyable popup via rofi."""
+"""Translate the selection and show a copyable popup via rofi.
+
+Translation order: on-disk cache, direct HTTP call to the translate
+endpoint, then crow as an offline fallback (optional — it need not be
+installed).
+"""
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+import sqlite3
 import subprocess
 import sys
-from typing import List, Optional
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# On-disk LRU of past translations; a hit skips the network (and crow)
+# entirely, which matters when re-translating the same word repeatedly.
+CACHE_PATH = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "selection_translate.sqlite"
+)
+_CACHE_MAX_ROWS = 10_000
+_CACHE_MAX_AGE = 30 * 24 * 3600
 
 
 def _run_command(command: List[str], input_text: Optional[str] = None) -> Optional[str]:
@@ -26,22 +46,177 @@ def _notify(title: str, message: str) -> None:
     subprocess.run(["notify-send", title, message], check=False)
 
 
-def _get_selection() -> Optional[str]:
-    output = _run_command(["copyq", "selection"])
-    if output is None:
+def _cache_key(text: str) -> bytes:
+    target = os.environ.get("TRANS_TL", "en")
+    return hashlib.sha1(f"auto\0{target}\0".encode() + text.encode()).digest()
+
+
+def _cache_connect() -> Optional[sqlite3.Connection]:
+    """Open (and prune) the translation cache; None when unavailable."""
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(k BLOB PRIMARY KEY, v TEXT, ts INTEGER)"
+        )
+        now = int(time.time())
+        conn.execute(
+            "DELETE FROM translations WHERE ts < ?", (now - _CACHE_MAX_AGE,)
+        )
+        conn.execute(
+            "DELETE FROM translations WHERE k IN ("
+            "SELECT k FROM translations ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+            (_CACHE_MAX_ROWS,),
+        )
+    except (OSError, sqlite3.Error):
         return None
-    selection = output.strip()
-    return selection if selection else None
+    return conn
 
 
-def _translate(text: str) -> Optional[str]:
-    output = _run_command(["crow", "--brief", "--stdin"], input_text=text)
-    if output is None:
+def _cache_get(conn: sqlite3.Connection, key: bytes) -> Optional[str]:
+    try:
+        row = conn.execute(
+            "SELECT v FROM translations WHERE k = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        # Touch the row so recently used entries survive pruning.
+        conn.execute(
+            "UPDATE translations SET ts = ? WHERE k = ?", (int(time.time()), key)
+        )
+        return row[0]
+    except sqlite3.Error:
         return None
-    translation = output.strip()
+
+
+def _cache_put(conn: sqlite3.Connection, key: bytes, translation: str) -> None:
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO translations (k, v, ts) VALUES (?, ?, ?)",
+            (key, translation, int(time.time())),
+        )
+    except sqlite3.Error:
+        pass
+
+
+async def _discard_proc(proc: "asyncio.subprocess.Process") -> None:
+    """Dismiss a pre-spawned helper that turned out not to be needed.
+
+    communicate(b"") (rather than wait()) closes stdin and drains the pipes,
+    so the transport doesn't stall waiting for EOF from lingering children.
+    """
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+    try:
+        await proc.communicate(b"")
+    except (OSError, ValueError):
+        pass
+
+
+def _translate_http(text: str) -> Optional[str]:
+    """Translate via the Google endpoint crow itself wraps, without the child.
+
+    One HTTPS request replaces a fork+exec plus Perl interpreter startup.
+    The target language follows crow's convention via $TRANS_TL ("en" by
+    default). Returns None on any network or payload error.
+    """
+    import json
+    import urllib.parse
+    import urllib.request
+
+    params = urllib.parse.urlencode(
+        {
+            "client": "gtx",
+            "sl": "auto",
+            "tl": os.environ.get("TRANS_TL", "en"),
+            "dt": "t",
+            "q": text,
+        }
+    )
+    request = urllib.request.Request(
+        f"https://translate.googleapis.com/translate_a/single?{params}",
+        headers={"User-Agent": "Mozilla/5.0"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=3) as response:
+            data = json.loads(response.read())
+        translation = "".join(seg[0] for seg in data[0] if seg and seg[0])
+    except (OSError, ValueError, LookupError, TypeError):
+        return None
+    translation = translation.strip()
     return translation if translation else None
 
 
+async def _translate_pipeline() -> Tuple[Optional[str], Optional[str]]:
+    """Fetch the selection and translate it, overlapping process startup.
+
+    copyq and crow are spawned concurrently so their fork+exec costs overlap
+    instead of running back to back. Once the selection arrives, the direct
+    HTTP call is tried first; the already-running crow only does the work
+    when that fails (offline, endpoint change). crow is strictly optional:
+    when it isn't installed the cache and HTTP paths still run. rofi still
+    runs afterwards because its -mesg needs the finished translation.
+
+    Returns (selection, translation); both None when copyq failed.
+    """
+    sel_proc, crow_proc = await asyncio.gather(
+        asyncio.create_subprocess_exec(
+            "copyq",
+            "selection",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        ),
+        asyncio.create_subprocess_exec(
+            "crow",
+            "--brief",
+            "--stdin",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        ),
+        return_exceptions=True,
+    )
+    if isinstance(crow_proc, BaseException):
+        crow_proc = None
+    if isinstance(sel_proc, BaseException):
+        if crow_proc is not None:
+            await _discard_proc(crow_proc)
+        return None, None
+
+    sel_bytes, _ = await sel_proc.communicate()
+    selection = sel_bytes.decode(errors="replace").strip()
+    if sel_proc.returncode != 0 or not selection:
+        if crow_proc is not None:
+            await _discard_proc(crow_proc)
+        return None, None
+
+    conn = _cache_connect()
+    key = _cache_key(selection)
+    if conn is not None:
+        cached = _cache_get(conn, key)
+        if cached is not None:
+            if crow_proc is not None:
+                await _discard_proc(crow_proc)
+            return selection, cached
+
+    translation = await asyncio.to_thread(_translate_http, selection)
+    if crow_proc is not None:
+        if translation is not None:
+            await _discard_proc(crow_proc)
+        else:
+            out_bytes, _ = await crow_proc.communicate(selection.encode())
+            if crow_proc.returncode == 0:
+                translation = out_bytes.decode(errors="replace").strip() or None
+
+    if conn is not None and translation is not None:
+        _cache_put(conn, key, translation)
+    return selection, translation
+
+
 def _copy_to_clipboard(text: str) -> bool:
     try:
         subprocess.run(["copyq", "copy", text], check=True)
@@ -74,14 +249,13 @@ def _show_rofi(translation: str) -> bool:
 
 
 def main() -> int:
-    selection = _get_selection()
+    selection, translation = asyncio.run(_translate_pipeline())
     if not selection:
         _notify("Translation", "No selection text found.")
         return 1
 
-    translation = _translate(selection)
     if not translation:
-        _notify("Translation", "Crow returned no translation.")
+        _notify("Translation", "No translation available.")
         return 1
 
     if not _show_rofi(translation):
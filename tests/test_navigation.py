@@ -0,0 +1,290 @@
+"""Unit tests for the IPC parsing and state helpers.
+
+Everything runs against canned JSON objects (and a throwaway Unix socket
+for the IPC reply path) — no compositor is needed. Run with:
+
+    python3 -m unittest discover tests
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import contextual_workspace_nav as nav  # noqa: E402
+import niri_state_daemon as daemon  # noqa: E402
+
+
+def _window(wid, **extra):
+    win = {
+        "id": wid,
+        "title": f"win-{wid}",
+        "app_id": "app",
+        "is_focused": False,
+        "workspace_id": 1,
+        "layout": {"pos_in_scrolling_layout": [1, wid]},
+    }
+    win.update(extra)
+    return win
+
+
+class ActionRequestTests(unittest.TestCase):
+    def test_kebab_case_becomes_pascal_variant(self):
+        self.assertEqual(
+            nav._action_request("focus-column-left"),
+            {"Action": {"FocusColumnLeft": {}}},
+        )
+
+    def test_single_word_action(self):
+        self.assertEqual(
+            nav._action_request("screenshot"), {"Action": {"Screenshot": {}}}
+        )
+
+
+class WindowsFromPayloadTests(unittest.TestCase):
+    def test_bare_list(self):
+        wins = [_window(1), _window(2)]
+        self.assertEqual(nav._windows_from_payload(wins), wins)
+
+    def test_dict_with_windows_key(self):
+        wins = [_window(1)]
+        self.assertEqual(nav._windows_from_payload({"windows": wins}), wins)
+
+    def test_non_dict_entries_are_dropped(self):
+        wins = [_window(1), "garbage", None, _window(2)]
+        self.assertEqual(
+            nav._windows_from_payload(wins), [_window(1), _window(2)]
+        )
+
+    def test_error_shapes_yield_empty_list(self):
+        for payload in (None, 42, "oops", {"windows": "not-a-list"}, {}):
+            self.assertEqual(nav._windows_from_payload(payload), [])
+
+
+class IdentityTests(unittest.TestCase):
+    def test_primary_key_wins(self):
+        win = _window(7, persistent_id="abc")
+        self.assertEqual(nav._window_identity(win), (("persistent_id", "abc"),))
+
+    def test_falls_back_to_id(self):
+        self.assertEqual(nav._window_identity(_window(7)), (("id", 7),))
+
+    def test_fallback_tuple_when_no_primary_key(self):
+        win = {"workspace_id": 2, "app_id": "term", "title": "sh", "pid": 42}
+        self.assertEqual(
+            nav._window_identity(win),
+            (
+                ("workspace_id", 2),
+                ("app_id", "term"),
+                ("title", "sh"),
+                ("pid", 42),
+            ),
+        )
+
+    def test_cache_is_used_on_repeat(self):
+        win = _window(3)
+        cache = {}
+        first = nav._window_identity(win, cache)
+        win["id"] = 99  # the cache keys on id(win), not content
+        self.assertEqual(nav._window_identity(win, cache), first)
+
+    def test_index_by_identity(self):
+        wins = [_window(1), _window(2)]
+        index = nav._index_by_identity(wins)
+        self.assertIs(index[(("id", 2),)], wins[1])
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        nav._COLUMN_KEYS_CACHE = None
+
+    def test_layout_change_is_detected(self):
+        before = _window(1)
+        after = _window(1, layout={"pos_in_scrolling_layout": [2, 1]})
+        self.assertNotEqual(
+            nav._window_snapshot(before), nav._window_snapshot(after)
+        )
+
+    def test_irrelevant_change_is_ignored(self):
+        before = _window(1)
+        after = _window(1, title="renamed")
+        self.assertEqual(
+            nav._window_snapshot(before), nav._window_snapshot(after)
+        )
+
+    def test_column_keys_are_included(self):
+        before = _window(1, column_width=0.5)
+        after = _window(1, column_width=0.7)
+        self.assertNotEqual(
+            nav._window_snapshot(before), nav._window_snapshot(after)
+        )
+
+    def test_missing_layout_data(self):
+        snapshot = nav._window_snapshot({"workspace_id": 3})
+        self.assertEqual(
+            snapshot, (("layout", None), ("workspace_id", 3))
+        )
+
+    def test_freeze_is_order_insensitive_and_hashable(self):
+        a = nav._freeze({"x": [1, {"b": 2, "a": 1}]})
+        b = nav._freeze({"x": [1, {"a": 1, "b": 2}]})
+        self.assertEqual(a, b)
+        hash(a)  # must not raise
+
+
+class IpcReplyTests(unittest.TestCase):
+    """Exercise _niri_ipc_reply against a fake $NIRI_SOCKET server."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.sock_path = os.path.join(self._tmp.name, "niri.sock")
+        self._old_env = os.environ.get("NIRI_SOCKET")
+        os.environ["NIRI_SOCKET"] = self.sock_path
+        nav._niri_sock = None
+
+    def tearDown(self):
+        if nav._niri_sock is not None:
+            nav._niri_sock.close()
+            nav._niri_sock = None
+        if self._old_env is None:
+            os.environ.pop("NIRI_SOCKET", None)
+        else:
+            os.environ["NIRI_SOCKET"] = self._old_env
+
+    def _serve(self, handlers):
+        """Accept one connection per handler, in order, on a thread."""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.sock_path)
+        server.listen(len(handlers))
+        self.addCleanup(server.close)
+
+        def run():
+            for handler in handlers:
+                conn, _ = server.accept()
+                with conn:
+                    handler(conn)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 1.0)
+
+    @staticmethod
+    def _reply_with(payload):
+        def handler(conn):
+            conn.makefile("rb").readline()
+            conn.sendall(json.dumps(payload).encode() + b"\n")
+
+        return handler
+
+    def test_ok_reply(self):
+        self._serve([self._reply_with({"Ok": {"Handled": None}})])
+        self.assertEqual(
+            nav._niri_ipc_reply({"Action": {"FocusColumnLeft": {}}}),
+            {"Ok": {"Handled": None}},
+        )
+
+    def test_err_reply_is_returned_raw(self):
+        self._serve([self._reply_with({"Err": "unknown action"})])
+        reply = nav._niri_ipc_reply({"Action": {"Bogus": {}}})
+        self.assertEqual(reply, {"Err": "unknown action"})
+        self.assertNotIn("Ok", reply)
+
+    def test_ok_payload_extraction(self):
+        self._serve([self._reply_with({"Ok": {"Windows": [_window(1)]}})])
+        self.assertEqual(nav._niri_ipc("Windows"), {"Windows": [_window(1)]})
+
+    def test_err_reply_yields_no_payload(self):
+        self._serve([self._reply_with({"Err": "nope"})])
+        self.assertIsNone(nav._niri_ipc("Windows"))
+
+    def test_reconnects_after_server_closed_the_cached_connection(self):
+        def close_without_reply(conn):
+            conn.makefile("rb").readline()
+
+        self._serve(
+            [close_without_reply, self._reply_with({"Ok": {"Handled": None}})]
+        )
+        # Prime the cached connection; the server drops it without replying,
+        # so the second attempt must transparently reconnect.
+        self.assertIsNotNone(nav._get_niri_sock())
+        self.assertEqual(
+            nav._niri_ipc_reply("Windows"), {"Ok": {"Handled": None}}
+        )
+
+    def test_unavailable_socket_returns_none(self):
+        # Nothing is listening on the path at all.
+        self.assertIsNone(nav._niri_ipc_reply("Windows"))
+
+
+class NiriStateTests(unittest.TestCase):
+    def _state_with_windows(self, *windows):
+        state = daemon.NiriState()
+        state.apply({"WindowsChanged": {"windows": list(windows)}})
+        return state
+
+    def test_windows_changed_sets_ready_and_focus(self):
+        state = self._state_with_windows(
+            _window(1), _window(2, is_focused=True)
+        )
+        self.assertTrue(state.ready)
+        self.assertEqual(state.focused_id, 2)
+        self.assertEqual(sorted(state.windows), [1, 2])
+
+    def test_not_ready_before_initial_replay(self):
+        state = daemon.NiriState()
+        state.apply({"WindowFocusChanged": {"id": 1}})
+        self.assertFalse(state.ready)
+
+    def test_window_opened_takes_focus(self):
+        state = self._state_with_windows(_window(1, is_focused=True))
+        state.apply(
+            {"WindowOpenedOrChanged": {"window": _window(2, is_focused=True)}}
+        )
+        self.assertEqual(state.focused_id, 2)
+        self.assertFalse(state.windows[1]["is_focused"])
+
+    def test_window_closed_clears_focus(self):
+        state = self._state_with_windows(_window(1, is_focused=True))
+        state.apply({"WindowClosed": {"id": 1}})
+        self.assertEqual(state.windows, {})
+        self.assertIsNone(state.focused_id)
+
+    def test_focus_changed_flips_flags(self):
+        state = self._state_with_windows(
+            _window(1, is_focused=True), _window(2)
+        )
+        state.apply({"WindowFocusChanged": {"id": 2}})
+        self.assertEqual(state.focused_id, 2)
+        self.assertFalse(state.windows[1]["is_focused"])
+        self.assertTrue(state.windows[2]["is_focused"])
+
+    def test_layouts_changed_updates_layout(self):
+        state = self._state_with_windows(_window(1))
+        new_layout = {"pos_in_scrolling_layout": [3, 1]}
+        state.apply({"WindowLayoutsChanged": {"changes": [[1, new_layout]]}})
+        self.assertEqual(state.windows[1]["layout"], new_layout)
+
+    def test_overview_toggles(self):
+        state = daemon.NiriState()
+        state.apply({"OverviewOpenedOrClosed": {"is_open": True}})
+        self.assertTrue(state.overview_is_open)
+        state.apply({"OverviewOpenedOrClosed": {"is_open": False}})
+        self.assertFalse(state.overview_is_open)
+
+    def test_snapshot_round_trips_through_json(self):
+        state = self._state_with_windows(_window(1, is_focused=True))
+        snap = json.loads(state.snapshot())
+        self.assertEqual(snap["focused_id"], 1)
+        self.assertFalse(snap["overview_is_open"])
+        self.assertEqual(snap["windows"], [state.windows[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()